@@ -6,7 +6,11 @@ This script fetches all downloads from your Real-Debrid account using their REST
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import orjson
+import pandas as pd
 import csv
 from datetime import datetime
 from typing import List, Dict, Any
@@ -24,61 +28,63 @@ BASE_URL = "https://api.real-debrid.com/rest/1.0"
 DOWNLOADS_ENDPOINT = f"{BASE_URL}/downloads"
 
 
+class RealDebridError(Exception):
+    """Raised when the Real-Debrid API returns a non-retryable error."""
+
+
 class RealDebridHistory:
     def __init__(self, api_token: str):
         self.api_token = api_token
         self.headers = {"Authorization": f"Bearer {api_token}"}
-    
-    def fetch_downloads(self, limit: int = 5000) -> List[Dict[str, Any]]:
+        # Reuse one pooled session for every API call so TCP/TLS connections
+        # are kept alive instead of re-handshaking per request.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504]),
+        )
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self.headers)
+
+    def fetch_downloads(self, limit: int = 5000, page: int = 1) -> List[Dict[str, Any]]:
         """
         Fetch downloads from Real-Debrid API
-        
+
         Args:
             limit: Maximum number of downloads to fetch
-        
+            page: Page number to fetch
+
         Returns:
             List of download dictionaries
+
+        Raises:
+            RealDebridError: If the API request fails after retries or
+                returns an unparseable body.
         """
+        print(f"🔍 Fetching downloads from Real-Debrid (limit: {limit})...")
+
+        # Transient errors (429/5xx) are retried by the Retry policy mounted
+        # on the session; anything surviving that is not worth retrying here.
         try:
-            print(f"🔍 Fetching downloads from Real-Debrid (limit: {limit})...")
-            
-            # Try different parameter combinations
-            params_options = [
-                {"limit": limit},
-                {"limit": limit, "page": 1},
-                {"limit": limit, "offset": 0},
-                {}  # No parameters
-            ]
-            
-            for i, params in enumerate(params_options):
-                try:
-                    print(f"   Trying parameters: {params}")
-                    response = requests.get(DOWNLOADS_ENDPOINT, headers=self.headers, params=params)
-                    response.raise_for_status()
-                    
-                    # Check if response is valid JSON
-                    if response.text.strip():
-                        downloads = response.json()
-                        if downloads:
-                            print(f"✅ Successfully fetched {len(downloads)} downloads")
-                            return downloads
-                        else:
-                            print(f"   Empty response with params: {params}")
-                    else:
-                        print(f"   Empty response body with params: {params}")
-                    
-                except requests.exceptions.RequestException as e:
-                    print(f"   Request failed with params {params}: {e}")
-                except json.JSONDecodeError as e:
-                    print(f"   JSON decode error with params {params}: {e}")
-                    print(f"   Response text: {response.text[:200]}...")
-            
-            print("❌ All parameter combinations failed")
-            return []
-        
-        except Exception as e:
-            print(f"❌ Unexpected error: {e}")
+            response = self.session.get(DOWNLOADS_ENDPOINT,
+                                        params={"limit": limit, "page": page})
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise RealDebridError(f"Failed to fetch downloads: {e}") from e
+
+        if response.status_code == 204 or not response.text.strip():
             return []
+
+        try:
+            # orjson decodes the raw bytes ~3x faster than response.json()
+            downloads = orjson.loads(response.content)
+        except json.JSONDecodeError as e:
+            raise RealDebridError(f"Invalid JSON from Real-Debrid: {e}") from e
+
+        print(f"✅ Successfully fetched {len(downloads)} downloads")
+        return downloads
     
     def display_downloads(self, downloads: List[Dict[str, Any]], max_display: int = 50):
         """
@@ -91,26 +97,23 @@ class RealDebridHistory:
         if not downloads:
             print("No downloads found.")
             return
-            
+
         print(f"\n📋 Displaying first {min(max_display, len(downloads))} downloads:")
         print("-" * 100)
-        print(f"{'ID':<12} {'Filename':<50} {'Size (MB)':<12} {'Status':<10}")
-        print("-" * 100)
-        
-        for download in downloads[:max_display]:
-            download_id = str(download.get('id', 'N/A'))
-            filename = download.get('filename', 'N/A')
-            # Truncate filename if too long
-            if len(filename) > 47:
-                filename = filename[:44] + "..."
-            
-            # Convert size to MB if available
-            size_bytes = download.get('bytes', 0)
-            size_mb = size_bytes / (1024 * 1024) if size_bytes else 0
-            
-            status = download.get('status', 'N/A')
-            
-            print(f"{download_id:<12} {filename:<50} {size_mb:<12.1f} {status:<10}")
+
+        # Render through pandas so the per-row formatting happens in one
+        # vectorized pass instead of a Python loop.
+        df = pd.DataFrame(downloads).reindex(columns=['id', 'filename', 'bytes', 'status'])
+        df['bytes'] = df['bytes'].fillna(0)
+        print(df.head(max_display).to_string(
+            index=False,
+            header=['ID', 'Filename', 'Size (MB)', 'Status'],
+            formatters={
+                'filename': lambda v: (v[:44] + '...') if isinstance(v, str) and len(v) > 47 else v,
+                'bytes': lambda b: f"{b / (1024 * 1024):.1f}",
+            },
+            na_rep='N/A',
+        ))
     
     def save_to_json(self, downloads: List[Dict[str, Any]], filename: str = None):
         """
@@ -125,8 +128,11 @@ class RealDebridHistory:
             filename = f"real_debrid_downloads_{timestamp}.json"
         
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(downloads, f, indent=2, ensure_ascii=False)
+            # orjson serializes in C and emits UTF-8 bytes directly, so this
+            # is a single buffered write instead of json.dump's slow
+            # character-by-character indenting.
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(downloads, option=orjson.OPT_INDENT_2))
             print(f"💾 Downloads saved to {filename}")
         except Exception as e:
             print(f"❌ Error saving to JSON: {e}")
@@ -175,17 +181,23 @@ class RealDebridHistory:
         """
         if not downloads:
             return {}
-        
-        total_downloads = len(downloads)
-        total_size_bytes = sum(d.get('bytes', 0) for d in downloads)
+
+        # Vectorized aggregation: sum and value_counts run in C instead of a
+        # per-row Python loop.
+        df = pd.DataFrame(downloads)
+        total_downloads = len(df)
+        if 'bytes' in df.columns:
+            total_size_bytes = int(df['bytes'].fillna(0).sum())
+        else:
+            total_size_bytes = 0
         total_size_gb = total_size_bytes / (1024**3)
-        
+
         # Count by status
-        status_counts = {}
-        for download in downloads:
-            status = download.get('status', 'Unknown')
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
+        if 'status' in df.columns:
+            status_counts = df['status'].fillna('Unknown').value_counts().to_dict()
+        else:
+            status_counts = {'Unknown': total_downloads}
+
         return {
             'total_downloads': total_downloads,
             'total_size_gb': total_size_gb,
@@ -203,8 +215,12 @@ def main():
     fetcher = RealDebridHistory(API_TOKEN)
     
     # Fetch downloads - get up to 200
-    downloads = fetcher.fetch_downloads(limit=200)
-    
+    try:
+        downloads = fetcher.fetch_downloads(limit=200)
+    except RealDebridError as e:
+        print(f"❌ {e}")
+        return
+
     if not downloads:
         print("❌ No downloads found or error occurred.")
         return